@@ -1,27 +1,31 @@
-from binaryninja import BinaryView, StructureBuilder, Type
+from binaryninja import BinaryView, StructureBuilder, Type, log_debug
+from functools import lru_cache
+from itertools import accumulate, groupby
+from operator import itemgetter
 
 # Slightly hacky approach but works well for now. Maps PyStruct fmt string to Binary Ninja Types
+# Built once at import, make_bn_struct looks these up for every struct field.
+_BN_TYPE_MAP = {
+    'H': Type.int(2, False),  # Unsigned short
+    '2s': Type.array(Type.char(), 2),
+    '4s': Type.array(Type.char(), 4),
+    '26s': Type.array(Type.char(), 26),
+    'B': Type.char(),         # Unsigned char
+    'I': Type.int(4, False),   # Unsigned int
+    'B*': Type.pointer(arch=None,type=Type.char(),width=4) # char*
+}
+# Byte widths of the above, known statically so struct offsets never need Type.width
+_FMT_WIDTH = {'H': 2, '2s': 2, '4s': 4, '26s': 26, 'B': 1, 'I': 4, 'B*': 4}
+
 def get_bn_type_from_format(fmt):
-    bn_struct_map = {
-        'H': Type.int(2, False),  # Unsigned short
-        '2s': Type.array(Type.char(), 2),
-        '4s': Type.array(Type.char(), 4),
-        '26s': Type.array(Type.char(), 26),
-        'B': Type.char(),         # Unsigned char
-        'I': Type.int(4, False),   # Unsigned int
-        'B*': Type.pointer(arch=None,type=Type.char(),width=4) # char*
-    }
-    return bn_struct_map.get(fmt, Type.void())
-
-def make_bn_struct(fmt, var_names):
-    struct = StructureBuilder.create()
-    offset = 0
-    fmt_pairs = zip(fmt.split(), var_names)
+    return _BN_TYPE_MAP.get(fmt, Type.void())
 
-    for f, var in fmt_pairs:
-        bn_type = get_bn_type_from_format(f)
-        struct.insert(offset, bn_type, var)
-        offset += bn_type.width
+def make_bn_struct(fmt_tokens, var_names):
+    struct = StructureBuilder.create()
+    #Offsets are a running sum of the format widths, fields are placed exactly where the PyStruct layout puts them.
+    offsets = accumulate((_FMT_WIDTH.get(f, 0) for f in fmt_tokens), initial=0)
+    for offset, f, var in zip(offsets, fmt_tokens, var_names):
+        struct.insert(offset, get_bn_type_from_format(f), var)
 
     return struct
 
@@ -29,105 +33,94 @@ def make_bn_struct(fmt, var_names):
 
 
 #Common datatypes:
-def create_struct(bv: BinaryView, bn_type: str, addr: int):
-    if bn_type == "SceLibEnt_prx2arm":
-    # Add structs to bn datatypes
-        struct_fmt = "B B H H H H H B B B B I I I I"
-        struct_vars = [
-            "structsize", "reserved1", "version", "attribute", "nfunc",
-            "nvar", "ntlsvar", "hashinfo", "hashinfotls", "reserved2",
-            "nidaltsets", "libname_nid", "libname", "nidtable", "addtable"
-        ]
-        scelibent_dt = make_bn_struct(struct_fmt, struct_vars)
-        bv.define_user_type("SceLibEnt_prx2arm", Type.structure_type(scelibent_dt))
-
-        #Remove any mis-interpreted instructions(functions) at data_addr
-        try:
-            rem_func = bv.get_functions_containing(addr)
-            bv.remove_function(rem_func[0])
-        except:
-            pass
-        scelibent_type = bv.get_type_by_name("SceLibEnt_prx2arm")
-        bv.define_data_var(addr=addr,var_type=scelibent_type)
-
-    elif bn_type == "SceLibStub_prx2arm":
-        struct_fmt = "B B H H H H H 4s I I I I I I I I I"
-        struct_vars = [
-            "structsize", "reserved1", "version", "attribute", "nfunc",
-            "nvar", "ntlsvar", "reserved2", "libname_nid", "libname",
-            "sce_sdk_version", "func_nidtable", "func_table", "var_nidtable",
-            "var_table", "tls_nidtable", "tls_table"
-        ]
-        scelibstub_dt = make_bn_struct(struct_fmt, struct_vars)
-        bv.define_user_type("SceLibStub_prx2arm", Type.structure_type(scelibstub_dt))
-
-        #Remove any mis-interpreted instructions(functions) at data_addr
-        try:
-            rem_func = bv.get_functions_containing(addr)
-            bv.remove_function(rem_func[0])
-        except:
-            pass
-        scelibstub_type = bv.get_type_by_name("SceLibStub_prx2arm")
-        bv.define_data_var(addr=addr,var_type=scelibstub_type)
-
-    elif bn_type == "SceLibStub_prx2arm_new":
-        struct_fmt = "B B H H H H H I I I I I I"
-        struct_vars = [
-            "structsize", "reserved1", "version", "attribute", "nfunc",
-            "nvar", "ntlsvar", "libname_nid", "libname", "func_nidtable",
-            "func_table", "var_nidtable", "var_table"
-        ]
-        scelibstub_dt = make_bn_struct(struct_fmt, struct_vars)
-        bv.define_user_type("SceLibStub_prx2arm_new", Type.structure_type(scelibstub_dt))
-
-        #Remove any mis-interpreted instructions(functions) at data_addr
-        try:
-            rem_func = bv.get_functions_containing(addr)
-            bv.remove_function(rem_func[0])
-        except:
-            pass
-        scelibstub_type = bv.get_type_by_name("SceLibStub_prx2arm_new")
-        bv.define_data_var(addr=addr,var_type=scelibstub_type)
-
-    elif bn_type == "SceModuleInfo_prx2arm":
-        struct_fmt = "H 2s 26s B B I I I I I I I I I I I I I I I"
-        struct_vars = [
-            "modattribute", "modversion", "modname", "terminal", "infoversion",
-            "resreve", "ent_top", "ent_end", "stub_top", "stub_end",
-            "dbg_fingerprint", "tls_top", "tls_filesz", "tls_memsz",
-            "start_entry", "stop_entry", "arm_exidx_top", "arm_exidx_end",
-            "arm_extab_top", "arm_extab_end"
-        ]
-        scemodinfo_dt = make_bn_struct(struct_fmt, struct_vars)
-        bv.define_user_type("SceModuleInfo_prx2arm", Type.structure_type(scemodinfo_dt))
-
-        #Remove any mis-interpreted instructions(functions) at data_addr
-        try:
-            rem_func = bv.get_functions_containing(addr)
-            bv.remove_function(rem_func[0])
-        except:
-            pass
-        scemodinfo_type = bv.get_type_by_name("SceModuleInfo_prx2arm")
-        bv.define_data_var(addr=addr,var_type=scemodinfo_type)
-
-    #This one is a bit tricky as size varies between 0x20 on FW 0.895, 0x2C on FW 0.931.010, 0x30 on FW 0.945, 0x34 on FW 3.60. We take on the 0x30 default for the time being, tiny errors don't really matter here but TODO: Get size first.
-    elif bn_type == "SceProcessParam":
-        struct_fmt = "I 4s I I B* I I I B* I I B*"
-        struct_vars = [
-            "size", "magic", "version", "sdk_version", "sceUserMainThreadName",
-            "sceUserMainThreadPriority", "sceUserMainThreadStackSize", "sceUserMainThreadAttribute",
-            "sceProcessName", "sce_process_preload_disabled", "sceUserMainThreadCpuAffinityMask",
-            "sce_libcparam"#, "unk_0x30"
-        ]
-        sceprocparam_dt = make_bn_struct(struct_fmt, struct_vars)
-        bv.define_user_type("SceProcessParam", Type.structure_type(sceprocparam_dt))
-
-        #Remove any mis-interpreted instructions(functions) at data_addr
-        try:
-            rem_func = bv.get_functions_containing(addr)
-            bv.remove_function(rem_func[0])
-        except:
-            pass
-        sceprocparam_type = bv.get_type_by_name("SceProcessParam")
-        bv.define_data_var(addr=addr,var_type=sceprocparam_type)
-
+_SCELIBENT_FMT = "B B H H H H H B B B B I I I I"
+_SCELIBENT_VARS = (
+    "structsize", "reserved1", "version", "attribute", "nfunc",
+    "nvar", "ntlsvar", "hashinfo", "hashinfotls", "reserved2",
+    "nidaltsets", "libname_nid", "libname", "nidtable", "addtable"
+)
+
+_SCELIBSTUB_FMT = "B B H H H H H 4s I I I I I I I I I"
+_SCELIBSTUB_VARS = (
+    "structsize", "reserved1", "version", "attribute", "nfunc",
+    "nvar", "ntlsvar", "reserved2", "libname_nid", "libname",
+    "sce_sdk_version", "func_nidtable", "func_table", "var_nidtable",
+    "var_table", "tls_nidtable", "tls_table"
+)
+
+_SCELIBSTUB_NEW_FMT = "B B H H H H H I I I I I I"
+_SCELIBSTUB_NEW_VARS = (
+    "structsize", "reserved1", "version", "attribute", "nfunc",
+    "nvar", "ntlsvar", "libname_nid", "libname", "func_nidtable",
+    "func_table", "var_nidtable", "var_table"
+)
+
+_SCEMODINFO_FMT = "H 2s 26s B B I I I I I I I I I I I I I I I"
+_SCEMODINFO_VARS = (
+    "modattribute", "modversion", "modname", "terminal", "infoversion",
+    "resreve", "ent_top", "ent_end", "stub_top", "stub_end",
+    "dbg_fingerprint", "tls_top", "tls_filesz", "tls_memsz",
+    "start_entry", "stop_entry", "arm_exidx_top", "arm_exidx_end",
+    "arm_extab_top", "arm_extab_end"
+)
+
+#This one is a bit tricky as size varies between 0x20 on FW 0.895, 0x2C on FW 0.931.010, 0x30 on FW 0.945, 0x34 on FW 3.60. We take on the 0x30 default for the time being, tiny errors don't really matter here but TODO: Get size first.
+_SCEPROCPARAM_FMT = "I 4s I I B* I I I B* I I B*"
+_SCEPROCPARAM_VARS = (
+    "size", "magic", "version", "sdk_version", "sceUserMainThreadName",
+    "sceUserMainThreadPriority", "sceUserMainThreadStackSize", "sceUserMainThreadAttribute",
+    "sceProcessName", "sce_process_preload_disabled", "sceUserMainThreadCpuAffinityMask",
+    "sce_libcparam"#, "unk_0x30"
+)
+
+_STRUCT_SPECS = {
+    "SceLibEnt_prx2arm": (tuple(_SCELIBENT_FMT.split()), _SCELIBENT_VARS),
+    "SceLibStub_prx2arm": (tuple(_SCELIBSTUB_FMT.split()), _SCELIBSTUB_VARS),
+    "SceLibStub_prx2arm_new": (tuple(_SCELIBSTUB_NEW_FMT.split()), _SCELIBSTUB_NEW_VARS),
+    "SceModuleInfo_prx2arm": (tuple(_SCEMODINFO_FMT.split()), _SCEMODINFO_VARS),
+    "SceProcessParam": (tuple(_SCEPROCPARAM_FMT.split()), _SCEPROCPARAM_VARS),
+}
+
+@lru_cache(maxsize=None)
+def _build_struct(fmt_tokens: tuple, var_names: tuple):
+    """
+    Build the StructureBuilder for a spec once per session, it is shared by every BinaryView the plugin is run on.
+    """
+    return make_bn_struct(fmt_tokens, var_names)
+
+def _ensure_type(bv: BinaryView, name: str, fmt_tokens, var_names):
+    """
+    Return the named struct type from the BinaryView, only building and defining it the first time it is requested.
+    """
+    bn_type = bv.get_type_by_name(name)
+    if bn_type is None:
+        bv.define_user_type(name, Type.structure_type(_build_struct(fmt_tokens, var_names)))
+        bn_type = bv.get_type_by_name(name)
+    return bn_type
+
+def _safe_remove_function(bv: BinaryView, addr: int, label: str, debug: bool = False):
+    """
+    Remove any mis-interpreted instructions(functions) at data addr.
+    """
+    #Most struct addresses are clean, check first instead of raising and catching on every miss.
+    rem_funcs = bv.get_functions_containing(addr)
+    if rem_funcs:
+        bv.remove_function(rem_funcs[0])
+    elif debug:
+        log_debug(f"No function at {label} location 0x{addr:X}")
+
+def create_structs_batch(bv: BinaryView, items, debug: bool = False):
+    """
+    Define many struct data vars in one pass. Items are (bn_type, addr) tuples, grouped by type so each type is only resolved once, all under a single undo action.
+    debug logs every struct address that had no function to clean up, callers pass vita_loader's DEBUG flag.
+    """
+    with bv.undoable_transaction():
+        for bn_type, group in groupby(sorted(items, key=itemgetter(0)), key=itemgetter(0)):
+            spec = _STRUCT_SPECS.get(bn_type)
+            if spec is None:
+                continue
+            fmt_tokens, var_names = spec
+            struct_type = _ensure_type(bv, bn_type, fmt_tokens, var_names)
+            for _, addr in group:
+                _safe_remove_function(bv, addr, bn_type, debug)
+                bv.define_data_var(addr=addr,var_type=struct_type)
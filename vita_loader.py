@@ -2,6 +2,7 @@ from binaryninja import (
     PluginCommand,
     log_error,
     log_info,
+    log_debug,
     BinaryView,
     Symbol,
     SymbolType,
@@ -11,8 +12,66 @@ from binaryninja import (
 )
 import threading
 import struct
+import sys
+from array import array
+import os
+import json
 import yaml
-from .structs import create_struct
+#libyaml backed loader when available, the pure Python SafeLoader is much slower on the NID DB
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+from .structs import create_structs_batch
+
+#Vita ELFs are always little endian, formats are compiled once at import.
+_ELF_HDR = struct.Struct("<HHIIIIIHHHHHH")
+_PH = struct.Struct("<IIIIIIII")
+#SceModuleInfo, expanded for easier format character mapping
+_SCE_MOD_INFO = struct.Struct("<"
+    "H"    # unsigned short modattribute
+    "2s"   # unsigned char modversion[2]
+    "26s"  # char modname[26]
+    "B"    # char terminal
+    "B"    # char infoversion
+    "I"    # Elf32_Addr reserve
+    "I"    # Elf32_Addr ent_top
+    "I"    # Elf32_Addr ent_end
+    "I"    # Elf32_Addr stub_top
+    "I"    # Elf32_Addr stub_end
+    "I"    # Elf32_Word dbg_fingerprint
+    "I"    # Elf32_Addr tls_top
+    "I"    # Elf32_Addr tls_filesz
+    "I"    # Elf32_Addr tls_memsz
+    "I"    # Elf32_Addr start_entry
+    "I"    # Elf32_Addr stop_entry
+    "I"    # Elf32_Addr arm_exidx_top
+    "I"    # Elf32_Addr arm_exidx_end
+    "I"    # Elf32_Addr arm_extab_top
+    "I"    # Elf32_Addr arm_extab_end
+)
+_EXPORT = struct.Struct("<BBHHHHHBBBBIIII")     # _scelibent_prx2arm
+_IMPORT_34 = struct.Struct("<BBHHHHH4sIIIIIIIII") # _scelibstub_prx2arm
+_IMPORT_24 = struct.Struct("<BBHHHHHIIIIII")      # _scelibstub_prx2arm_new
+#ELF types SceModuleInfo is located for, see get_module_info_offset
+_ET_SCE_EXEC = 0xFE00
+_ET_SCE_RELEXEC = 0xFE04
+_ET_SCE_ARMRELEXEC = 0xFFA5
+_SCE_ETYPES = frozenset((_ET_SCE_EXEC, _ET_SCE_RELEXEC, _ET_SCE_ARMRELEXEC))
+_ELF_HEAD_READ = 0x200  # First read of the file, covers the ELF header and the program header table that follows it in Vita ELFs
+
+_NID_CACHE_VERSION = 1  # Bump when the cached NID index layout changes
+
+DEBUG = False  # Per library/symbol/struct debug logging (also passed to structs.py), off by default as it formats a message for every symbol
+
+#Default import type, Types are immutable so one instance is shared by every function without a header prototype
+_VOID_VARARG_FN = Type.function(Type.void(), [], variable_arguments=True)
+
+def _default_nid_namer(library_name: str):
+    """
+    Formatter for the default name of a NID missing from the NID DB, nid -> "<library>_<NID>". Built once per library, braces in the libname (read from the binary) are escaped.
+    """
+    return (library_name.replace("{", "{{").replace("}", "}}") + "_{:08X}").format
 
 class VitaElf():
     def __init__(self, bv: BinaryView):
@@ -22,15 +81,22 @@ class VitaElf():
         self.raw = bv.parent_view
         self.bv = bv
         self.nid_database = None
-        self.struct_endianness = "<"  # Little endian for struct unpacking
+        self._func_proto_cache = {}  # function name -> Type.function from the vitasdk header
+        self._func_index = {}  # library_nid -> {function_nid: name}
+        self._var_index = {}   # library_nid -> {variable_nid: name}
+        #Collected by process_exports/process_imports, applied together by apply_symbols
+        self._pending_structs = []  # (bn_type, addr)
+        self._pending_funcs = []    # (addr, name)
+        self._pending_vars = []     # (addr, name)
+        self._str_cache = {}        # addr -> string decoded by read_string_at, the ELF does not change during a run
+        self._data_addrs = set()    # data symbol addrs, functions covering them are removed by clean_data_segs
 
 
 
-    def load_vita_symbols(self):
+    def collect_vita_symbols(self):
         """
-        Inject resolved function and variable symbols into the existing ARMv7 BinaryView.
-
-        This first parses the raw ELF to find e_entry, uses that to locate the SceModuleInfo struct which contains start/end offsets for import/export stubs/entrys. These offsets are used to parse through and add import/export libraries including all functions(and variables) within using the NID DB as a lookup table. These library functions & variables are then loaded into the default ELF BinaryView. Finally, because BN picks up lots of instructions('functions') past the final import stub(stub_end) and Vita binaries (in all my tests) only contain in-line data past that point, these functions are removed from the BinaryView.
+        Compute phase of symbol injection, does not modify the BinaryView so it can run off the UI thread (inject_vita_symbols applies the results).
+        Parses the ELF and SceModuleInfo, loads the NID DB and headers, and collects every struct, function and variable to define. Returns False on failure.
         """
         try:
             self.parse_elf()
@@ -39,19 +105,40 @@ class VitaElf():
             self.load_headers()
             self.process_exports(self.bv)
             self.process_imports(self.bv)
-            self.bv.add_entry_point(self.module_start_addr)
-            self.clean_data_segs()
-            log_info("Symbols added successfully.")
+        except Exception as e:
+            log_error(f"Error collecting symbols: {e}")
+            return False
+        return True
 
+    def inject_vita_symbols(self):
+        """
+        Apply phase of symbol injection, all BinaryView writes for the collected header types, structs and symbols. Run on the main thread.
+        """
+        #Hold analysis while symbols are defined and functions created/removed, so no analysis pass starts on a half injected view
+        self.bv.set_analysis_hold(True)
+        try:
+            #One undo step for the whole injection, the nested transactions below fold into this one
+            with self.bv.undoable_transaction():
+                self.define_header_types()
+                self.apply_symbols()
+                self.bv.add_entry_point(self.module_start_addr)
+                self.clean_data_segs()
         except Exception as e:
             log_error(f"Error adding symbols: {e}")
+            return
+        finally:
+            self.bv.set_analysis_hold(False)
+
+        #Single analysis update for everything above, non-blocking as this runs on the UI thread
+        self.bv.update_analysis()
+        log_info("Symbols added successfully.")
 
 
     def parse_elf(self):
         """
         Parse the ELF and program headers
         """
-        header_data = self.raw.read(0, 0x40)
+        header_data = self.raw.read(0, _ELF_HEAD_READ)
         e_ident = header_data[:16]
         self.ei_class = e_ident[4]
         self.ei_data = e_ident[5]
@@ -60,16 +147,13 @@ class VitaElf():
         if self.ei_class != 1:
             raise Exception("Unsupported ELF class (only 32-bit supported)")
 
-        #should always be little endian for vita binaries but will trip on other 32 bit elfs, maybe remove big endian check all together and fall one exception if not littleE.
-        if self.ei_data == 1:
-            self.struct_endianness = "<"  #littleE
-        elif self.ei_data == 2:
-            self.struct_endianness = ">"  #bigE
-        else:
+        #should always be little endian for vita binaries, the precompiled structs are little endian only.
+        if self.ei_data == 2:
+            raise Exception("Unsupported ELF data encoding (only little endian supported)")
+        elif self.ei_data != 1:
             raise Exception("Unknown ELF data encoding")
 
-        elf_header_struct = self.struct_endianness + "HHIIIIIHHHHHH"
-        elf_header = struct.unpack(elf_header_struct, header_data[16:52])
+        elf_header = _ELF_HDR.unpack_from(header_data, 16)
 
         (
             self.e_type,
@@ -87,18 +171,28 @@ class VitaElf():
             self.e_shstrndx,
         ) = elf_header
 
-        #get the program headers.
-        self.program_headers = []
-        for i in range(self.e_phnum):
-            ph_offset = self.e_phoff + i * self.e_phentsize
-            ph_data = self.raw.read(ph_offset, self.e_phentsize)
-            if len(ph_data) < self.e_phentsize:
-                log_error(f"Incomplete program header {i} at offset 0x{ph_offset:X}")
-                continue
-            ph_struct = self.struct_endianness + "IIIIIIII"
-            ph = struct.unpack(ph_struct, ph_data)
-            self.program_headers.append(ph)
-        self.base_addr = self.program_headers[0][2]
+        #get the program headers, read as one table and kept as one tuple per field (ph_type[i], ph_offset[i], ...)
+        #Sliced from the first read when it already covers the table, else read separately
+        ph_size = self.e_phnum * self.e_phentsize
+        if self.e_phoff + ph_size <= len(header_data):
+            ph_data = header_data[self.e_phoff:self.e_phoff + ph_size]
+        else:
+            ph_data = self.raw.read(self.e_phoff, ph_size)
+        ph_count = min(self.e_phnum, len(ph_data) // self.e_phentsize)
+        if ph_count < self.e_phnum:
+            log_error(f"Incomplete program headers at offset 0x{self.e_phoff:X}, read {ph_count} of {self.e_phnum}")
+        program_headers = [_PH.unpack_from(ph_data, i * self.e_phentsize) for i in range(ph_count)]
+        (
+            self.ph_type,
+            self.ph_offset,
+            self.ph_vaddr,
+            self.ph_paddr,
+            self.ph_filesz,
+            self.ph_memsz,
+            self.ph_flags,
+            self.ph_align,
+        ) = zip(*program_headers) if program_headers else ((),) * 8
+        self.base_addr = self.ph_vaddr[0]
 
 
     def parse_sce_module_info(self):
@@ -122,30 +216,7 @@ class VitaElf():
             log_error("Invalid SceModuleInfo struct.")
             return None
 
-        #unpacking SceModuleInfo, expanded for easier format character mapping
-        module_info_struct = self.struct_endianness + (
-            "H"    # unsigned short modattribute
-            "2s"   # unsigned char modversion[2]
-            "26s"  # char modname[26]
-            "B"    # char terminal
-            "B"    # char infoversion
-            "I"    # Elf32_Addr reserve
-            "I"    # Elf32_Addr ent_top
-            "I"    # Elf32_Addr ent_end
-            "I"    # Elf32_Addr stub_top
-            "I"    # Elf32_Addr stub_end
-            "I"    # Elf32_Word dbg_fingerprint
-            "I"    # Elf32_Addr tls_top
-            "I"    # Elf32_Addr tls_filesz
-            "I"    # Elf32_Addr tls_memsz
-            "I"    # Elf32_Addr start_entry
-            "I"    # Elf32_Addr stop_entry
-            "I"    # Elf32_Addr arm_exidx_top
-            "I"    # Elf32_Addr arm_exidx_end
-            "I"    # Elf32_Addr arm_extab_top
-            "I"    # Elf32_Addr arm_extab_end
-        )
-        SceModuleInfo_unpacked = struct.unpack(module_info_struct, module_info_data)
+        SceModuleInfo_unpacked = _SCE_MOD_INFO.unpack_from(module_info_data)
 
         (
             self.attributes,    # short modattribute
@@ -179,43 +250,34 @@ class VitaElf():
         For ET_SCE_EXEC modules, when e_entry is not null, SceModuleInfo structure is located in text segment at offset e_entry. Else it is located in text segment (first LOAD segment) at offset Elf32_Phdr[text_seg_id].p_paddr - Elf32_Phdr[text_seg_id].p_offset.
         For ET_SCE_RELEXEC modules, SceModuleInfo structure is located in the segment indexed by the upper two bits of e_entry of the ELF header. The structure is stored at the base offset of the segment plus the offset defined by the bottom 30 bits of e_entry.
         """
-        ET_SCE_RELEXEC = 0xFE04
-        ET_SCE_EXEC = 0xFE00
-        ET_SCE_ARMRELEXEC = 0xFFA5
         PT_LOAD = 1
 
         '''
         #Commented this out, only in rare cases is SceModuleInfo at e_entry for ET_SCE_EXEC?
         #No such cases found in ~20 binaries checked but this should be easily confirmed by pulling first struct member(attribute) and checking for "SCE_MODULE_ATTR_*"
-        if self.e_type == ET_SCE_EXEC:
+        if self.e_type == _ET_SCE_EXEC:
             if self.e_entry != 0: #This isnt always true, only in some cases?
                 # SceModuleInfo is at e_entry, havent seen it in current binaries but according to wiki.henkaku.xyz/vita/PRX it can happen.
                 return self.e_entry
             else:
                 # Use p_paddr - p_offset of the first PT_LOAD segment
-                for ph in self.program_headers:
-                    p_type = ph[0]
-                    p_offset = ph[1]
-                    p_paddr = ph[3]
+                for p_type, p_offset, p_paddr in zip(self.ph_type, self.ph_offset, self.ph_paddr):
                     if p_type == PT_LOAD:
                         mod_info_offset = p_paddr - p_offset #this should be vaddr?
                         if mod_info_offset >= 0:
                             return mod_info_offset
         '''
         #For ET_SCE_RELEXEC and ET_SCE_ARMRELEXEC (AND FOR ET_SCE_EXEC in all test binaries)
-        if self.e_type in [ET_SCE_RELEXEC, ET_SCE_ARMRELEXEC, ET_SCE_EXEC]: #Some ET_SCE_EXEC
+        if self.e_type in _SCE_ETYPES: #Some ET_SCE_EXEC
             #ET_SCE_EXEC: in text segment (first LOAD seg) at offset Elf32_Phdr[text_seg_id].p_paddr - Elf32_Phdr[text_seg_id].p_offset
             #ET_SCE_RELEXEC: SceModuleInfo struct is in segment indexed by the upper two bits of e_entry
             seg_idx = (self.e_entry >> 30) & 0x3
             #Offset within segment
             seg_offset = self.e_entry & 0x3FFFFFFF
 
-            if seg_idx < len(self.program_headers):
-                ph = self.program_headers[seg_idx]
-                p_type = ph[0]
-                p_offset = ph[1]
-                if p_type == PT_LOAD:
-                    return p_offset + seg_offset
+            if seg_idx < len(self.ph_type):
+                if self.ph_type[seg_idx] == PT_LOAD:
+                    return self.ph_offset[seg_idx] + seg_offset
 
 
     def load_nid_database(self):
@@ -227,12 +289,112 @@ class VitaElf():
         if not nid_db_path:
             raise Exception("NID database YAML file is required")
 
+        #Reuse the flattened indexes from a previous run if the YAML has not changed since
+        if self.load_nid_cache(nid_db_path):
+            return
+
         #load db in nid_database class var
         try:
             with open(nid_db_path, "r") as f:
-                self.nid_database = yaml.safe_load(f)
+                self.nid_database = yaml.load(f, Loader=_YamlLoader)
+            self.build_nid_index()
         except Exception as e:
-            raise Exception(f"Failed to load NID database: {e}")
+            #Empty indexes, every symbol falls back to its <library>_<NID> name
+            self._func_index = {}
+            self._var_index = {}
+            log_error(f"Failed to load NID database, symbols will use default names: {e}")
+            return
+
+        self.save_nid_cache(nid_db_path)
+
+    def nid_db_stamp(self, nid_db_path):
+        """
+        Identify a NID DB file revision by path, mtime and size, stored in the cache to detect a changed YAML.
+        """
+        st = os.stat(nid_db_path)
+        return [os.path.abspath(nid_db_path), st.st_mtime_ns, st.st_size]
+
+    def load_nid_cache(self, nid_db_path):
+        """
+        Load the NID indexes cached as JSON next to the YAML NID DB. Returns False if the cache is missing, was built from a different YAML revision or is malformed.
+        The cache is plain data (it may come along with a shared NID DB), every entry is type checked on the way in.
+        The first line holds only the version and YAML stamp, checked before the index payload on the second line is decoded.
+        """
+        cache_path = nid_db_path + ".cache.json"
+        try:
+            with open(cache_path, "r") as f:
+                header = json.loads(f.readline())
+                if header.get("version") != _NID_CACHE_VERSION or header.get("stamp") != self.nid_db_stamp(nid_db_path):
+                    return False
+                cache = json.loads(f.readline())
+            func_index = self.decode_nid_index(cache["func_index"])
+            var_index = self.decode_nid_index(cache["var_index"])
+        except Exception:
+            return False
+        self._func_index = func_index
+        self._var_index = var_index
+        return True
+
+    def save_nid_cache(self, nid_db_path):
+        """
+        Write the NID indexes as JSON next to the YAML NID DB so later loads can skip YAML parsing.
+        """
+        cache_path = nid_db_path + ".cache.json"
+        try:
+            header = {
+                "version": _NID_CACHE_VERSION,
+                "stamp": self.nid_db_stamp(nid_db_path),
+            }
+            cache = {
+                "func_index": self.encode_nid_index(self._func_index),
+                "var_index": self.encode_nid_index(self._var_index),
+            }
+            with open(cache_path, "w") as f:
+                #One JSON document per line, json.dumps never emits a raw newline
+                f.write(json.dumps(header) + "\n")
+                f.write(json.dumps(cache, separators=(",", ":")) + "\n")
+        except (OSError, TypeError, ValueError) as e:
+            log_info(f"Could not write NID database cache {cache_path}: {e}")
+
+    @staticmethod
+    def encode_nid_index(index):
+        """
+        library_nid -> {nid: name} as JSON objects, JSON keys are strings so the NIDs are written in hex.
+        """
+        return {f"{lib_nid:X}": {f"{nid:X}": name for nid, name in names.items()} for lib_nid, names in index.items()}
+
+    @staticmethod
+    def decode_nid_index(data):
+        """
+        Inverse of encode_nid_index, raises on anything that is not hex NID keys and string names.
+        """
+        index = {}
+        for lib_nid, names in data.items():
+            decoded = {}
+            for nid, name in names.items():
+                if not isinstance(name, str):
+                    raise ValueError(f"Bad NID cache entry {lib_nid}/{nid}")
+                decoded[int(nid, 16)] = name
+            index[int(lib_nid, 16)] = decoded
+        return index
+
+    def build_nid_index(self):
+        """
+        Index the modules->libraries->functions/variables tree of the NID DB into library_nid -> {nid: name} dicts, walked once here instead of once per symbol lookup.
+        """
+        modules = (self.nid_database or {}).get("modules") or {}
+        for module in modules.values():
+            for lib in (module.get("libraries") or {}).values():
+                library_nid = lib.get("nid")
+                if not isinstance(library_nid, int):
+                    continue  #binary libname_nids are always ints, nothing could match this library
+                lib_funcs = self._func_index.setdefault(library_nid, {})
+                lib_vars = self._var_index.setdefault(library_nid, {})
+                #setdefault keeps the first match, same as the old in-order scan
+                for func_name, nid in (lib.get("functions") or {}).items():
+                    lib_funcs.setdefault(nid, func_name)
+                for var_name, nid in (lib.get("variables") or {}).items():
+                    lib_vars.setdefault(nid, var_name)
 
     def load_headers(self):
         """
@@ -252,9 +414,19 @@ class VitaElf():
 
             #Store all types from vitasdk header for class-wide use.
             self.sdk_hdr = self.bv.platform.parse_types_from_source(header_content)
-            #Add types while we are here to avoid another header check
-            for name, tobj in self.sdk_hdr.types.items():
-	            self.bv.define_user_type(name, tobj)
+
+    def define_header_types(self):
+        """
+        Add all datatypes parsed from the vitasdk header (if one was loaded) to the BinaryView.
+        """
+        if not self.sdk_hdr:
+            return
+        #Only types not already in the view as-is (re-runs find them all defined), defined in one batch and one undo step
+        existing = self.bv.types
+        new_types = [(name, tobj) for name, tobj in self.sdk_hdr.types.items() if existing.get(name) != tobj]
+        if new_types:
+            with self.bv.undoable_transaction():
+                self.bv.define_user_types(new_types, None)
 
 
 
@@ -262,33 +434,42 @@ class VitaElf():
 
     def process_exports(self, bv: BinaryView):
         """
-        Process module exports, get library name, enumerate and lookup funcs/vars by NID, add functions/variable symbols into the default ELF BinaryView.
+        Process module exports, get library name, enumerate and lookup funcs/vars by NID, collect function/variable symbols for apply_symbols.
         """
         log_info("Parsing exports")
-        ph_offset = self.program_headers[0][1]
+        ph_offset = self.ph_offset[0]
         exports_offset = self.export_top + ph_offset
         exports_end = self.export_end + ph_offset
         if not exports_offset or not exports_end:
             log_error("Export sections not defined in SceModuleInfo.")
             return
 
+        #Bind hot methods once instead of resolving them on self for every symbol
+        read_tables = self.read_nid_entry_tables
+        func_index = self._func_index.get
+        var_index = self._var_index.get
+        add_struct = self._pending_structs.append
+        add_func = self._pending_funcs.append
+        add_data = self._pending_vars.append
+
+        #Read the whole ent_top..ent_end block once and walk it in place
+        block_start = exports_offset
+        export_block = memoryview(self.raw.read(block_start, exports_end - block_start))
 
         while exports_offset < exports_end:
+            pos = exports_offset - block_start
             #Consider splitting out _scelibent_ppu_common(size: 0x10), could be useful to leave flexibility for potential future integration of scelibent_psp and other PRX1 variants.
-            export_size_data = self.raw.read(exports_offset, 2)
-            if len(export_size_data) < 2:
+            if pos >= len(export_block):
                 log_error(f"Incomplete export size data at 0x{exports_offset:X}")
                 break
-            export_size = int.from_bytes(export_size_data, "little")
-            export_data = self.raw.read(exports_offset, export_size)
-            if len(export_data) < export_size:
+            export_size = export_block[pos]  #structsize, first byte of the entry
+            if pos + export_size > len(export_block):
                 log_error(f"Incomplete export data at 0x{exports_offset:X}")
                 break
-            export_struct = self.struct_endianness + "BBHHHHHBBBBIIII"
-            if len(export_data) < struct.calcsize(export_struct):
+            if export_size < _EXPORT.size:
                 log_error(f"Incomplete export structure at 0x{exports_offset:X}")
                 break
-            export_struct = struct.unpack(export_struct, export_data[:struct.calcsize(export_struct)])
+            export_struct = _EXPORT.unpack_from(export_block, pos)
             (
                 size,               #unsigned char structsize;
                 reserved1,          #unsigned char reserved1[1]; //a.k.a. 'auxattribute'
@@ -309,99 +490,98 @@ class VitaElf():
 
             # Add structs to bn datatypes
             abs_addr = self.base_addr + exports_offset - ph_offset
-            create_struct(self.bv, "SceLibEnt_prx2arm", abs_addr)
+            add_struct(("SceLibEnt_prx2arm", abs_addr))
 
 
             if attribute == 0x8000 and library_name_addr == 0:
                 library_name = "NONAME" #NONAME EXPORT,see: wiki.henkaku.xyz/vita/PRX#NONAME_exports
             else:
                 library_name = self.read_string_at(bv, library_name_addr)
-            #log_info(f"Exporting library: {library_name}\nExport struct: {export_struct}") #debug
-
-            for i in range(num_functions):
-                nid_addr = nid_table_addr + i * 4
-                entry_addr = entry_table_addr + i * 4
-                nid_data = bv.read(nid_addr, 4)
-                entry_data = bv.read(entry_addr, 4)
-                if len(nid_data) < 4 or len(entry_data) < 4:
-                    continue
-                function_nid = struct.unpack("<I", nid_data)[0]
-                function_addr = struct.unpack("<I", entry_data)[0]
+            if DEBUG: log_debug(f"Exporting library: {library_name}\nExport struct: {export_struct}")
+            fallback_name = _default_nid_namer(library_name)
+            #This library's NID -> name dicts, one probe per symbol below
+            lib_funcs = func_index(library_nid, {}).get
+            lib_vars = var_index(library_nid, {}).get
+
+            #Functions come first in both tables, followed by variables.
+            nids, entries = read_tables(bv, nid_table_addr, entry_table_addr, num_functions + num_vars)
+
+            for function_nid, function_addr in zip(nids[:num_functions], entries[:num_functions]):
                 if library_name == "NONAME" and function_nid == 0x935CD196:
                     function_name = "module_start"
                     self.module_start_addr = function_addr
                     function_addr -= 1 #Odd off by one byte causes misalignment on NONAME exports. Example: hex(struct.unpack("I",read(entry_table_addr,4)) = *module_start+1.
                 else:
-                    function_name = self.lookup_nid_function(library_nid, function_nid, library_name)
-                self.add_function_symbol(bv, function_addr, function_name)
-                #log_info(f"Exporting Function: {function_name}") #debug
-
-
-            for i in range(num_vars):
-                nid_addr = nid_table_addr + (num_functions + i) * 4
-                entry_addr = entry_table_addr + (num_functions + i) * 4
-                nid_data = bv.read(nid_addr, 4)
-                entry_data = bv.read(entry_addr, 4)
-                if len(nid_data) < 4 or len(entry_data) < 4:
-                    continue
-                variable_nid = struct.unpack("<I", nid_data)[0]
-                variable_addr = struct.unpack("<I", entry_data)[0]
+                    function_name = lib_funcs(function_nid) or fallback_name(function_nid)
+                add_func((function_addr, function_name))
+                if DEBUG: log_debug(f"Exporting Function: {function_name}")
+
+
+            for variable_nid, variable_addr in zip(nids[num_functions:], entries[num_functions:]):
                 # These two NONAME vars will always exist, TODO: Create lut(or add to nid.yml) as/if more are encountered in tests.
                 if library_name == "NONAME":
                     if variable_nid == 0x6C2224BA:
                         variable_name = "module_info"
-                        create_struct(self.bv, "SceModuleInfo_prx2arm", variable_addr)
+                        add_struct(("SceModuleInfo_prx2arm", variable_addr))
                     elif variable_nid == 0x70FBA1E7:
                         variable_name = "module_proc_param"
-                        create_struct(self.bv, "SceProcessParam", variable_addr)
+                        add_struct(("SceProcessParam", variable_addr))
+                    else:
+                        #Unknown NONAME var, nothing is defined for it, named only for the debug log below
+                        variable_name = fallback_name(variable_nid)
                 else:
-                    variable_name = self.lookup_nid_variable(library_nid, variable_nid, library_name)
-                    # If NONAME, create_struct defines the data var, can later change this to return the struct and add optional var_type to add_data_symbol().
-                    self.add_data_symbol(bv, variable_addr, variable_name)
-                #log_info(f"Exporting Variable: {variable_name} - Var addr: {hex(variable_addr)}") #debug
+                    variable_name = lib_vars(variable_nid) or fallback_name(variable_nid)
+                    # If NONAME, the struct batch in apply_symbols defines the data var, can later change this to return the struct and add optional var_type to add_data_symbol().
+                    add_data((variable_addr, variable_name))
+                if DEBUG: log_debug(f"Exporting Variable: {variable_name} - Var addr: {hex(variable_addr)}")
 
             exports_offset += size
 
     def process_imports(self, bv: BinaryView):
         """
-        Process module imports, get library name, enumerate and lookup funcs/vars by NID, add functions/variable symbols into the default ELF BinaryView.
+        Process module imports, get library name, enumerate and lookup funcs/vars by NID, collect function/variable symbols for apply_symbols.
         """
         log_info("Parsing imports")
-        ph_offset = self.program_headers[0][1]
+        ph_offset = self.ph_offset[0]
         imports_offset = self.import_top + ph_offset
         imports_end = self.import_end + ph_offset
         if not imports_offset or not imports_end:
             log_error("Import sections not defined in SceModuleInfo.")
             return
 
+        read_tables = self.read_nid_entry_tables
+        func_index = self._func_index.get
+        var_index = self._var_index.get
+        add_struct = self._pending_structs.append
+        add_func = self._pending_funcs.append
+        add_data = self._pending_vars.append
+
+        #Read the whole stub_top..stub_end block once and walk it in place
+        block_start = imports_offset
+        import_block = memoryview(self.raw.read(block_start, imports_end - block_start))
 
         while imports_offset < imports_end:
-            import_size_data = self.raw.read(imports_offset, 2)
-            if len(import_size_data) < 2:
+            pos = imports_offset - block_start
+            if pos >= len(import_block):
                 log_error(f"Incomplete import size data at 0x{imports_offset:X}")
                 break
-            import_size = int.from_bytes(import_size_data, "little")
+            import_size = import_block[pos]  #structsize, first byte of the stub
 
             # TODO: Can potentially be expanded to OG PSP binaries as-well(_scelibstub_psp - size: 0x14 or 0x18).
             if import_size == 0x34:
-                # _scelibstub_prx2arm
-                import_struct = self.struct_endianness + "BBHHHHH4sIIIIIIIII"
-                import_struct_size = 0x34
+                import_struct = _IMPORT_34
             elif import_size == 0x24:
-                # _scelibstub_prx2arm_new
-                import_struct = self.struct_endianness + "BBHHHHHIIIIII"
-                import_struct_size = 0x24
+                import_struct = _IMPORT_24
             else:
                 log_error(f"Unknown import size: {import_size} bytes at 0x{imports_offset:X}")
                 break
 
 
-            import_data = self.raw.read(imports_offset, import_size)
-            if len(import_data) < import_size:
+            if pos + import_size > len(import_block):
                 log_error(f"Incomplete import data at 0x{imports_offset:X}")
                 break
 
-            import_values = struct.unpack(import_struct, import_data[:import_struct_size])
+            import_values = import_struct.unpack_from(import_block, pos)
 
             abs_addr = self.base_addr + imports_offset - ph_offset
             # Extract import fields based on format
@@ -427,7 +607,7 @@ class VitaElf():
                     tls_entry_table_addr,   # Elf32_Addr tls_table
                 ) = import_values
                 # Add structs to bn datatypes
-                create_struct(self.bv, "SceLibStub_prx2arm", abs_addr)
+                add_struct(("SceLibStub_prx2arm", abs_addr))
             elif import_size == 0x24:
                 # _scelibstub_prx2arm_new
                 (
@@ -446,103 +626,89 @@ class VitaElf():
                     var_entry_table_addr,   # Elf32_Addr var_table
                 ) = import_values
                 # Add structs to bn datatypes
-                create_struct(self.bv, "SceLibStub_prx2arm_new", abs_addr)
+                add_struct(("SceLibStub_prx2arm_new", abs_addr))
 
 
             #get lib name
             library_name = self.read_string_at(bv, library_name_addr)
-            #log_info(f"Importing Library: {library_name}\nImport unpacked: {import_values}") #debug
+            if DEBUG: log_debug(f"Importing Library: {library_name}\nImport unpacked: {import_values}")
+            fallback_name = _default_nid_namer(library_name)
+            #None when the library is not in the NID DB, every name in it is then the default
+            lib_funcs = func_index(library_nid)
+            lib_vars = var_index(library_nid)
 
             # Process imported functions, lookup by nid, add symbol
-            for i in range(num_functions):
-                nid_addr = func_nid_table_addr + i * 4
-                entry_addr = func_entry_table_addr + i * 4
-                nid_data = bv.read(nid_addr, 4)
-                entry_data = bv.read(entry_addr, 4)
-                if len(nid_data) < 4 or len(entry_data) < 4:
-                    continue
-                function_nid = struct.unpack("<I", nid_data)[0]
-                function_stub_addr = struct.unpack("<I", entry_data)[0]
-                function_name = self.lookup_nid_function(library_nid, function_nid, library_name)
-                #log_info(f"Importing Function: {function_name}") #debug
-                self.add_function_symbol(bv, function_stub_addr, function_name)
+            func_nids, func_entries = read_tables(bv, func_nid_table_addr, func_entry_table_addr, num_functions)
+            #Resolve the whole library's names up front, then feed them to Binary Ninja in order
+            if lib_funcs:
+                func_names = [lib_funcs.get(function_nid) or fallback_name(function_nid) for function_nid in func_nids]
+            else:
+                func_names = list(map(fallback_name, func_nids))
+            for function_stub_addr, function_name in zip(func_entries, func_names):
+                if DEBUG: log_debug(f"Importing Function: {function_name}")
+                add_func((function_stub_addr, function_name))
 
             # process imported variables, lookup by nid, add symbol
-            for i in range(num_vars):
-                nid_addr = var_nid_table_addr + i * 4
-                entry_addr = var_entry_table_addr + i * 4
-                nid_data = bv.read(nid_addr, 4)
-                entry_data = bv.read(entry_addr, 4)
-                if len(nid_data) < 4 or len(entry_data) < 4:
-                    continue
-                variable_nid = struct.unpack("<I", nid_data)[0]
-                variable_addr = struct.unpack("<I", entry_data)[0]
-                variable_name = self.lookup_nid_variable(library_nid, variable_nid, library_name)
-                #log_info(f"Importing Variable: {variable_name} - Var addr: {variable_addr}") #debug
-                self.add_data_symbol(bv, variable_addr, variable_name)
+            var_nids, var_entries = read_tables(bv, var_nid_table_addr, var_entry_table_addr, num_vars)
+            if lib_vars:
+                var_names = [lib_vars.get(variable_nid) or fallback_name(variable_nid) for variable_nid in var_nids]
+            else:
+                var_names = list(map(fallback_name, var_nids))
+            for variable_addr, variable_name in zip(var_entries, var_names):
+                if DEBUG: log_debug(f"Importing Variable: {variable_name} - Var addr: {variable_addr}")
+                add_data((variable_addr, variable_name))
 
             imports_offset += size
 
 
 
-    def lookup_nid_function(self, library_nid, function_nid, library_name):
+    def apply_symbols(self):
         """
-        Lookup function name in the NID DB using library and function NIDs.
+        Define every struct, function and variable collected by process_exports/process_imports in the default ELF BinaryView, in one pass.
         """
-        #TODO: Figure out more efficient way, nested nightmare
-        if self.nid_database and "modules" in self.nid_database:
-            for module_name, module in self.nid_database["modules"].items():
-                if "libraries" in module:
-                    for lib_name, lib in module["libraries"].items():
-                        if lib.get("nid") == library_nid:
-                            functions = lib.get("functions", {})
-                            for func_name, nid in functions.items():
-                                if nid == function_nid:
-                                    return func_name
-        #give default name if not found
-        return f"{library_name}_{function_nid:08X}"
-
-    def lookup_nid_variable(self, library_nid, variable_nid, library_name):
+        #Symbol update notifications held until every export/import symbol is in
+        with self.bv.undoable_transaction():
+            create_structs_batch(self.bv, self._pending_structs, DEBUG)
+            with self.bv.bulk_modify_symbols():
+                for addr, name in self._pending_funcs:
+                    self.add_function_symbol(self.bv, addr, name)
+                for addr, name in self._pending_vars:
+                    self.add_data_symbol(self.bv, addr, name)
+
+    def get_func_type(self, name: str):
         """
-        Lookup variable name in the NID DB using library and function NIDs.
+        Function Type for an import/export, from its vitasdk header prototype if there is one, else void with variable arguments.
+        Header prototypes are built on first use and memoized per name, only the few hundred imported functions of the header's thousands are ever built.
         """
-        #TODO: Figure out more efficient way, nested nightmare
-        if self.nid_database and "modules" in self.nid_database:
-            for module_name, module in self.nid_database["modules"].items():
-                if "libraries" in module:
-                    for lib_name, lib in module["libraries"].items():
-                        if lib.get("nid") == library_nid:
-                            variables = lib.get("variables", {})
-                            for var_name, nid in variables.items():
-                                if nid == variable_nid:
-                                    return var_name
-        #give default name if not found
-        return f"{library_name}_{variable_nid:08X}"
+        func_type = self._func_proto_cache.get(name)
+        if func_type is None:
+            if self.sdk_hdr and name in self.sdk_hdr.functions:
+                proto = self.sdk_hdr.functions[name]
+                func_type = Type.function(proto.return_value, proto.parameters, variable_arguments=False)
+            else:
+                func_type = _VOID_VARARG_FN
+            self._func_proto_cache[name] = func_type
+        return func_type
 
     def add_function_symbol(self, bv: BinaryView, addr: int, name: str):
         """
         Create a void function at given addr with a variable number of arguments(To let BN try to determine args). Create a function symbol at addr with given name and add/define the imported function into the default ELF BinaryView.
         """
-        if not bv.get_function_at(addr):
-            bv.create_user_function(addr)
-
+        #Get the function pointer, create_user_function returns the new function so one lookup covers both cases
+        func = bv.get_function_at(addr) or bv.create_user_function(addr)
+        if func is None:
+            log_error(f"Failed to create function {name} at 0x{addr:X}")
+            return
 
         #Setting imports to void and tell binary ninja to resolve variables.
         #func_type = Type.function(Type.void(), [], variable_arguments=True)
 
-        if self.sdk_hdr and name in self.sdk_hdr.functions:
-            func_param = self.sdk_hdr.functions[name].parameters
-            func_ret = self.sdk_hdr.functions[name].return_value
-            func_type = Type.function(func_ret, func_param, variable_arguments=False)
-        else:
-            func_type = Type.function(Type.void(), [], variable_arguments=True)
+        func_type = self.get_func_type(name)
         #func_type = Type.function(None, None, variable_arguments=True)
 
-        #Get the function pointer
-        func = bv.get_function_at(addr)
-
-        #set type to void with variables
-        func.type = func_type
+        #set type to void with variables, skipped when a reload finds the function already typed this way
+        if func.type != func_type:
+            func.type = func_type
 
         symbol = Symbol(SymbolType.ImportedFunctionSymbol, addr, name)
 
@@ -552,44 +718,97 @@ class VitaElf():
     def add_data_symbol(self, bv: BinaryView, addr: int, name: str):
         """
         Create a data symbol at addr with given name and add/define the data variable into the default ELF BinaryView.
-        This will also check if a function was created(interpreted as instructions) at the data address and remove it if so.
+        The addr is recorded so clean_data_segs can remove a function created(interpreted as instructions) over the data address.
         """
         symbol = Symbol(SymbolType.DataSymbol, addr, name)
         bv.define_user_symbol(symbol)
 
-        # Binary Ninja likely mis-interpreted instructions(functions) at data_addr after linear sweep.
-        try:
-            rem_func = self.bv.get_functions_containing(addr)
-            self.bv.remove_function(rem_func[0])
-        except:
-            pass
+        # Binary Ninja likely mis-interpreted instructions(functions) at data_addr after linear sweep, removed together in clean_data_segs.
+        self._data_addrs.add(addr)
         bv.define_data_var(addr, Type.int(4, sign=False))
 
-    #There has to be a better pythonic way of doing this.
-    #Technically would be faster to read into overkill sized buffer and split at b"\x00".
-    def read_string_at(self, bv: BinaryView, addr: int):
+    def read_u32_table(self, bv: BinaryView, addr: int, count: int):
+        """
+        Reads a table of count little endian u32s (NID/entry tables) from addr in a single read, decoded in bulk into an array("I").
+        A short read is truncated to the complete entries.
+        """
+        data = bv.read(addr, count * 4)
+        table = array("I")
+        table.frombytes(data[:len(data) & ~3])
+        if sys.byteorder == "big":
+            table.byteswap()
+        return table
+
+    def read_nid_entry_tables(self, bv: BinaryView, nid_table_addr: int, entry_table_addr: int, count: int):
+        """
+        Reads a library's NID table and its matching entry table, count u32s each. Returns (nids, entries).
+        When the two tables are back to back (as the linker usually lays them out) both come from one read, else one read each.
+        """
+        if entry_table_addr == nid_table_addr + count * 4:
+            table = self.read_u32_table(bv, nid_table_addr, count * 2)
+            return table[:count], table[count:]
+        if nid_table_addr == entry_table_addr + count * 4:
+            table = self.read_u32_table(bv, entry_table_addr, count * 2)
+            return table[count:], table[:count]
+        return self.read_u32_table(bv, nid_table_addr, count), self.read_u32_table(bv, entry_table_addr, count)
+
+    def read_string_at(self, bv: BinaryView, addr: int, chunk: int = 64):
         """
         Reads a C(null-terminated) string from the given addr.
+        Reads in chunks and splits at the first b"\x00" rather than reading a byte at a time. The first chunk covers typical library names, each miss reads a 4x larger chunk.
+        Decoded strings are memoized per addr, import stubs of the same library share one libname string.
         """
-        s = b""
+        name = self._str_cache.get(addr)
+        if name is not None:
+            return name
+        buf = bytearray()  #grows in place for strings longer than one chunk
         while True:
-            c = bv.read(addr, 1)
-            if c == b"\x00" or not c:
+            data = bv.read(addr + len(buf), chunk)
+            if not data:
+                break
+            nul = data.find(b"\x00")
+            if nul >= 0:
+                buf += data[:nul]
+                break
+            buf += data
+            if len(data) < chunk:
                 break
-            s += c
-            addr += 1
-        return s.decode("ascii", errors="ignore")
+            chunk *= 4
+        name = self._str_cache[addr] = buf.decode("ascii", errors="ignore")
+        return name
 
     def clean_data_segs(self):
         '''
         With the last Linear Sweep run, Binary Ninja mis-identifies lots of data segments past import_end as instructions(functions). In all Vita binaries tested, everything past the import_end(SceModuleInfo.stub_end) is data.
-        This will remove/undefine those functions.
+        This will remove/undefine those functions, along with any function covering a data symbol address.
         '''
         end_imports = self.base_addr + self.import_end
-        funcs = self.bv.functions
-        for func in funcs:
-            if func.start > end_imports:
+        #Walk only the function starts past end_imports instead of building every Function in the view.
+        starts = []
+        addr = end_imports
+        while True:
+            addr_next = self.bv.get_next_function_start_after(addr)
+            if addr_next <= addr or addr_next >= self.bv.end:
+                break
+            starts.append(addr_next)
+            addr = addr_next
+
+        #Functions covering a data symbol, one lookup per data addr (a few dozen), deduplicated by start
+        data_funcs = {}
+        for data_addr in self._data_addrs:
+            rem_func = self.bv.get_functions_containing(data_addr)
+            if rem_func:
+                data_funcs[rem_func[0].start] = rem_func[0]
+        for start in starts:
+            data_funcs.pop(start, None)
+
+        #Collected first, removing while walking would shift the next-start lookups. All removals are one undo step.
+        with self.bv.undoable_transaction(), self.bv.bulk_modify_symbols():
+            for func in data_funcs.values():
                 self.bv.remove_function(func)
+            for start in starts:
+                for func in self.bv.get_functions_at(start):
+                    self.bv.remove_function(func)
 
 
 def sweep_before_load(bv):
@@ -604,6 +823,7 @@ def sweep_before_load(bv):
         func_cnt = 0    #function count
         i = 0           #current sweep iteration
         n_max = 5       #max linear sweep runs, stabilizes on 3-4 typically
+        sweep_tol = 0.001   #relative function count gain below which sweeping stops
 
         while i < n_max:
             bv.update_analysis_and_wait()           #wait for default analysis
@@ -615,14 +835,22 @@ def sweep_before_load(bv):
                 log_info(f"No new functions created at linearsweep: {i}")
                 break
 
+            #Another full sweep is not worth it once a sweep adds under sweep_tol of the functions
+            delta = cur_func_cnt - func_cnt
+            if i >= 2 and delta / max(1, func_cnt) < sweep_tol:
+                log_info(f"Only {delta} new functions created at linearsweep: {i}, stopping")
+                break
+
             func_cnt = cur_func_cnt
             i += 1
 
         if i >= n_max:
             log_info(f"ran {i} linear sweeps, potentially more functions undiscovered")
 
-        #Switch back to main UI event thread and run plugin
-        execute_on_main_thread(lambda: VitaElf(bv).load_vita_symbols())
+        #Parsing, NID DB loading and symbol resolution stay on this thread, only the BinaryView writes go back to the main UI event thread
+        vita_elf = VitaElf(bv)
+        if vita_elf.collect_vita_symbols():
+            execute_on_main_thread(vita_elf.inject_vita_symbols)
 
     #Run linear sweep analysis in new thread.
     threading.Thread(target=n_linearsweep).start()